@@ -35,13 +35,17 @@
 # IMPORTS
 #===============================================================================
 import datetime
-from decimal import Decimal, Context, getcontext, ROUND_HALF_DOWN
+from decimal import Decimal, Context, ROUND_HALF_DOWN
 import math
 import os
 import urllib2
 import re
+import tempfile
+import time
 import json as j
+import Rhino
 import rhinoscriptsyntax as rs
+import scriptcontext as sc
 
 
 
@@ -51,6 +55,12 @@ import rhinoscriptsyntax as rs
 #===============================================================================
 URL = 'http://www.pasiaalto.com/aalto/laser.json' # Server containing regular material settings
 
+_MATERIAL_CACHE_KEY = 'gcode_script_materials' # Key for material profiles kept in Rhino's sticky dictionary
+_MATERIAL_CACHE_FILE = os.path.join(tempfile.gettempdir(), 'gcode_materials.json') # Material profiles kept between Rhino sessions
+_MATERIAL_CACHE_TTL = 60 * 60 # Seconds before cached material profiles are fetched from server again
+_MATERIAL_REQUIRED_KEYS = ('Offline', 'Name', 'CurrentVersion', 'UpdateAddress', 'Max_X', 'Max_Y',
+                           'Materials', 'Start-up', 'End') # Server keys read by run_script, data missing any is not cached
+
 #===============================================================================
 # GLOBAL VARIABLES
 #===============================================================================
@@ -69,13 +79,20 @@ _LAYER_NAME_REPLACEMENTS = {' ': '_',
 # _CURVE_TO_LINE_SEGMENT_LENGTH = 0.7
 _G00_SPEED = 45 # The speed of slew movements
 _ESTIMATE_MODIFIER = 1 # Optional factor to multiply speed estimate with to compensate for acceleration
+_ALTERNATIVE_SORT_RANGE = 5 # Alternative sort cuts every nth open curve, unless the material profile sets 'AlternativeSortRange'
 
-WORLD_X_VECTOR = rs.VectorCreate(([1.0, 0.0, 0.0]), ([0.0, 0.0, 0.0]))
 WORLD_XY_PLANE = rs.WorldXYPlane()
 
 # Precision and rounding globals
 CONTEXT = Context(prec=28, rounding=ROUND_HALF_DOWN)
 ROUNDING = Decimal('1.000')
+_DECIMALS = -ROUNDING.as_tuple().exponent # Number of decimals in G-code coordinates, given by ROUNDING
+_COORDINATE = '%%.%df' % _DECIMALS # Format for a single coordinate, e.g. %.3f
+
+# G-code line templates
+_G00_TEMPLATE = '\nG00 X' + _COORDINATE + ' Y' + _COORDINATE + '\nM12\n' # Slew to start of cut and start laser
+_G01_TEMPLATE = 'G01 X' + _COORDINATE + ' Y' + _COORDINATE + '\n' # Linear cut
+_ARC_TEMPLATE = '%s X' + _COORDINATE + ' Y' + _COORDINATE + ' I' + _COORDINATE + ' J' + _COORDINATE + '\n' # G02/G03 circular cut
 
 
 class CurveObject:
@@ -86,6 +103,7 @@ class CurveObject:
         guid(guid) : Unique identifier for the curve object from Rhino
         curve_type (string): 
         area (float): Area of object if curve is closed
+        length (float): Length of curve
         start_point (array): Start point of curve
         end_point (array): End point of curve
         center_point (array): Centre point of curve if closed
@@ -96,13 +114,14 @@ class CurveObject:
     '''
 
     def __init__(self, guid, curve_type, curve_closed,
-                 curve_area, start_point, end_point,
+                 curve_area, curve_length, start_point, end_point,
                  center_point, bounding_box,):
 
         self.guid = guid
         self.curve_type = curve_type
         self.closed = curve_closed
         self.area = curve_area
+        self.length = curve_length
         self.start_point = start_point
         self.end_point = end_point
         self.center_point = center_point
@@ -119,6 +138,11 @@ def get_from_url(URL):
         False: If unable to get data
     '''
 
+    # Material profiles from a previous run are reused while still fresh
+    cached_data = get_cached_materials(URL)
+    if cached_data:
+        return cached_data
+
     request_headers = { "Accept": "application/json", "Connection": "close" }
     
     request = urllib2.Request(URL, headers=request_headers)
@@ -140,9 +164,93 @@ def get_from_url(URL):
         rs.MessageBox('Connected to server but no data found.', 0 | 48, 'Error: No data found')
         return False
 
+    # Offline notices and incomplete data are not cached,
+    # so the script recovers as soon as the server does
+    if is_cacheable_materials(data):
+        set_cached_materials(URL, data)
+
     return data
 
 
+def get_cached_materials(URL):
+    '''
+    Getting material data cached by a previous run of the script.
+    The Rhino session is checked first, then the cache file on disk.
+    Parameters:
+        URL (string): URL the data was fetched from
+    Returns:
+        data (json.data): Material data if a fresh cache was found
+        None: If no fresh cache was found
+    '''
+
+    now = time.time()
+
+    cached = sc.sticky.get(_MATERIAL_CACHE_KEY)
+    if cached and cached[0] == URL and now - cached[1] < _MATERIAL_CACHE_TTL:
+        return cached[2]
+
+    try:
+        cache_time = os.path.getmtime(_MATERIAL_CACHE_FILE)
+        if now - cache_time >= _MATERIAL_CACHE_TTL:
+            return None
+
+        with open(_MATERIAL_CACHE_FILE, 'r') as cache_file:
+            cached = j.load(cache_file)
+
+        if cached.get('URL') != URL:
+            return None
+        data = cached['Data']
+    except (IOError, OSError, ValueError, AttributeError, KeyError, TypeError):
+        # No cache file, unable to read it, or not written by this script
+        return None
+
+    if not is_cacheable_materials(data):
+        return None
+
+    print('Using cached material profiles')
+    sc.sticky[_MATERIAL_CACHE_KEY] = (URL, cache_time, data)
+    return data
+
+
+def is_cacheable_materials(data):
+    '''
+    Checking if material data is complete and worth caching.
+    Parameters:
+        data (json.data): Material data from server or cache
+    Returns:
+        True: If data has every key run_script reads and is no offline notice
+        False: Otherwise
+    '''
+
+    if not isinstance(data, dict):
+        return False
+
+    for key in _MATERIAL_REQUIRED_KEYS:
+        if key not in data:
+            return False
+
+    return data['Offline'] != 1
+
+
+def set_cached_materials(URL, data):
+    '''
+    Caching material data in the Rhino session and on disk.
+    Failing to write the cache file is not an error, the data is simply
+    fetched from the server again on the next run.
+    Parameters:
+        URL (string): URL the data was fetched from
+        data (json.data): Material data to cache
+    '''
+
+    sc.sticky[_MATERIAL_CACHE_KEY] = (URL, time.time(), data)
+
+    try:
+        with open(_MATERIAL_CACHE_FILE, 'w') as cache_file:
+            j.dump({'URL': URL, 'Data': data}, cache_file)
+    except (IOError, OSError) as e:
+        print('Unable to cache material profiles: %s' % e)
+
+
 def list_materials(server_data, title='Choose material'):
     '''
     Lists materials from server in the UI and prompts the user to chose one.
@@ -307,7 +415,8 @@ def get_objects_from_layer(layer_name):
     Parameters:
         layer_name (Rhino.layer) : Layer to get objects from
     Returns:
-        curve_object_list (list) : List of Rhino.curve objects from layer
+        curve_object_list (list) : List of Rhino.curve objects from layer,
+                                   all planar and in the world XY plane
         None : if no objects on layer or no name given
     '''
 
@@ -321,7 +430,7 @@ def get_objects_from_layer(layer_name):
 
     # Checking for any preselected objects
     selected_objects = rs.SelectedObjects(include_lights=True, include_grips=True)
-    if selected_objects is not None and selected_objects.__len__() > 0:
+    if selected_objects:
         # User has selected something in the document, need to deselect before processing
         rs.UnselectAllObjects()
 
@@ -331,7 +440,7 @@ def get_objects_from_layer(layer_name):
     rs.UnselectAllObjects()
     if duplicates_list:
         response = rs.MessageBox(
-            '%s duplicate objects found in document.\n'  % str(duplicates_list.__len__())
+            '%s duplicate objects found in document.\n'  % len(duplicates_list)
             + 'Exit script and remove duplicates manually?',
             4 | 48,
             'Duplicates found')
@@ -368,9 +477,9 @@ def get_objects_from_layer(layer_name):
                     # Curve is planar and in world XY plane
                     curve_object_list.append(obj)
 
-    if non_planar.__len__() > 0:
+    if non_planar:
         response = rs.MessageBox(
-            '%s non-planar curves found in document.\n' % str(non_planar.__len__())
+            '%s non-planar curves found in document.\n' % len(non_planar)
             + 'Exit script and fix non-planar curves manually?',
             4 | 48,
             'Curves not planar')
@@ -405,122 +514,143 @@ def interpret_curves(object_guid):
     Parameters:
         object_guid (list) : List of Rhino.object guid to process
     Returns:
-        curve_object_list (list): List of resulting CurveObjects
+        curve_object_list (list): List of resulting CurveObjects,
+                                  None if the user chose to exit
         objects_out_of_bounds (int): Number of objects out of bounds
-        objects_skipped (int): Number of objects skipped
+        objects_skipped_list (list): Guids of the objects out of bounds, or of
+                                     the curve that made the user exit
     '''
 
     print('Interpreting curves')
 
     # Variables
     objects_out_of_bounds = 0
-    objects_skipped = 0
     curve_object_list = []
     
     objects_skipped_list = []
 
     if object_guid:
-        
 
-            
+        # Functions used for every object are looked up once
+        is_curve_closed = rs.IsCurveClosed
+        is_curve_closable = rs.IsCurveClosable
+
         for obj in object_guid:
-            
-            c_object = None
-            curve_closed = None
-            curve_type = ''
-            curve_area = None
 
             # Check for curve validity
-            if bounding_box(obj):
-                # Get bounding box of objects
-                curveBBminX, curveBBmaxX, curveBBminY, curveBBmaxY = bounding_box(obj)
-                curve_bounding_box = [curveBBminX, curveBBmaxX, curveBBminY, curveBBmaxY]
-                valid = True
-            else:
+            curve_bounding_box = bounding_box(obj)
+            if not curve_bounding_box:
                 # Object is out of bounds.
                 objects_out_of_bounds += 1
                 objects_skipped_list.append(obj)
-                valid = False
-
-            if valid:
-                # Check if curve is planar
-                if not rs.IsCurvePlanar(obj):
-                    valid = False
-                    objects_skipped += 1
-                    objects_skipped_list.append(obj)
-
-            if valid:
-                # Check for open or closed curves
-                if rs.IsCurveClosed(obj):
-                    curve_closed = True
-                else:
-                    # If not closed, check if it makes sense to close it
-                    if rs.IsCurveClosable(obj):
-                        # If yes, then close it and assign the new object to the variable
-                        closed_obj = rs.CloseCurve(obj)
-                        if closed_obj is None:
-                            # The attempt to close the curve failed
-                            
-                            message = rs.MessageBox('Failed to close curve that was deemed closable. This is likely due to overlapping control points or error in the drawing process. Exit and fix object manually?', 4 | 48 | 0, 'ERROR: Unprocessed objects')
-                            if message == 6:
-                                # Yes was clicked
-                                return None, 0, 1, [obj]
-                            elif message == 7:
-                                # No was clicked
-                                # Program continues
-                                pass
-                            curve_closed = False
-                            
-                        else:
-                            curve_closed = True
-                            obj = closed_obj
-                    else:
-                        curve_closed = False
-                
-                # Determine the type of curve
-                if rs.IsCircle(obj):
-                    curve_type = 'circle'
-                    center_point = rs.CircleCenterPoint(obj)
-                elif rs.IsArc(obj):
-                    curve_type = 'arc'
-                    center_point = rs.ArcCenterPoint(obj)
-                elif rs.IsEllipse(obj):
-                    curve_type = 'ellipse'
-                    center_point = rs.EllipseCenterPoint(obj)
-                elif rs.IsPolyCurve(obj):
-                    curve_type = 'polycurve'
-                    center_point = None
-                elif rs.IsLine(obj):
-                    curve_type = 'line'
-                    center_point = None
-                elif rs.IsPolyline(obj):
-                    curve_type = 'polyline'
-                    center_point = None
-                else:
-                    curve_type = 'curve'
-                    # These are NURBS / interpolated curves
-                    center_point = None
+                continue
+
+            # Planarity has already been validated by get_objects_from_layer
+
+            # Check for open or closed curves
+            if is_curve_closed(obj):
+                curve_closed = True
+            elif is_curve_closable(obj):
+                # If not closed, but it makes sense to close it,
+                # then close it and assign the new object to the variable
+                closed_obj = rs.CloseCurve(obj)
+                if closed_obj is None:
+                    # The attempt to close the curve failed
+
+                    message = rs.MessageBox('Failed to close curve that was deemed closable. This is likely due to overlapping control points or error in the drawing process. Exit and fix object manually?', 4 | 48 | 0, 'ERROR: Unprocessed objects')
+                    if message == 6:
+                        # Yes was clicked
+                        return None, 0, [obj]
+                    elif message == 7:
+                        # No was clicked
+                        # Program continues
+                        pass
+                    curve_closed = False
 
-                # Calculate closed curve area
-                if curve_closed:
-                    curve_area = rs.CurveArea(obj)[0]
                 else:
-                    curve_area = None
-
-                # Get start and end point
-                start_point = rs.CurveStartPoint(obj)
-                end_point = rs.CurveEndPoint(obj)
+                    curve_closed = True
+                    obj = closed_obj
+            else:
+                curve_closed = False
 
-                # Create a new curveObject containing the information generated
-                c_object = CurveObject(obj, curve_type, curve_closed, curve_area, start_point,
-                                      end_point, center_point, curve_bounding_box)
+            # Everything below only reads from the curve
+            c_object = create_curve_object(obj, curve_closed, list(curve_bounding_box))
 
-                curve_object_list.append(c_object)
+            curve_object_list.append(c_object)
 
         # Returning the list of interpreted objects, unsorted
-        return curve_object_list, objects_out_of_bounds, objects_skipped, objects_skipped_list
+        return curve_object_list, objects_out_of_bounds, objects_skipped_list
     else:
-        return None
+        return [], 0, []
+
+
+def create_curve_object(obj, curve_closed, curve_bounding_box):
+    '''
+    Creating a CurveObject from a single curve and adding meta data.
+    The curve is only read from, never modified in the document.
+    Parameters:
+        obj (guid) : Rhino.object guid of the curve
+        curve_closed (bool) : True if the curve is closed
+        curve_bounding_box (list) : Extremes of the curves bounding box
+                                    [min_x, max_x, min_y, max_y]
+    Returns:
+        c_object (CurveObject): The resulting CurveObject
+    '''
+
+    # Curve geometry is fetched once and read directly from here on
+    geometry = rs.coercecurve(obj)
+
+    # Determine the type of curve.
+    # Line and polyline geometry is recognised by its type first, sparing the
+    # most common curves the circle, arc and ellipse checks.
+    if isinstance(geometry, Rhino.Geometry.LineCurve):
+        curve_type = 'line'
+        center_point = None
+    elif isinstance(geometry, Rhino.Geometry.PolylineCurve):
+        # A polyline with only two points is a line, longer ones may still be collinear
+        if geometry.PointCount == 2 or rs.IsLine(geometry):
+            curve_type = 'line'
+        else:
+            curve_type = 'polyline'
+        center_point = None
+    elif rs.IsCircle(geometry):
+        curve_type = 'circle'
+        center_point = geometry.TryGetCircle(sc.doc.ModelAbsoluteTolerance)[1].Center
+    elif rs.IsArc(geometry):
+        curve_type = 'arc'
+        center_point = geometry.TryGetArc()[1].Center
+    elif rs.IsEllipse(geometry):
+        curve_type = 'ellipse'
+        center_point = geometry.TryGetEllipse()[1].Plane.Origin
+    elif rs.IsPolyCurve(geometry):
+        curve_type = 'polycurve'
+        center_point = None
+    elif rs.IsLine(geometry):
+        curve_type = 'line'
+        center_point = None
+    elif rs.IsPolyline(geometry):
+        curve_type = 'polyline'
+        center_point = None
+    else:
+        curve_type = 'curve'
+        # These are NURBS / interpolated curves
+        center_point = None
+
+    # Calculate closed curve area
+    if curve_closed:
+        curve_area = rs.CurveArea(geometry)[0]
+    else:
+        curve_area = None
+
+    curve_length = geometry.GetLength()
+
+    # Get start and end point
+    start_point = geometry.PointAtStart
+    end_point = geometry.PointAtEnd
+
+    # Create a new curveObject containing the information generated
+    return CurveObject(obj, curve_type, curve_closed, curve_area, curve_length,
+                       start_point, end_point, center_point, curve_bounding_box)
 
 
 def sort_advanced(object_list, material_data=None):
@@ -588,13 +718,14 @@ def sort_advanced(object_list, material_data=None):
             key=lambda CurveObject: (CurveObject.start_point[0], CurveObject.start_point[1]),
             reverse=True
             )
-        list_range = 5
-        split_list = [curves_open[i::list_range] for i in xrange(list_range)]
-        curves_open_new = []
-        for x in split_list:
-            for y in x:
-                curves_open_new.append(y)
-        curves_open = curves_open_new
+        try:
+            list_range = int(material_data.get('AlternativeSortRange', _ALTERNATIVE_SORT_RANGE))
+        except (TypeError, ValueError):
+            list_range = _ALTERNATIVE_SORT_RANGE
+        if list_range < 1:
+            # A range of 0 or less would crash or drop every open curve
+            list_range = _ALTERNATIVE_SORT_RANGE
+        curves_open = [curve for i in xrange(list_range) for curve in curves_open[i::list_range]]
 
 
     # Combine open and closed again
@@ -712,96 +843,49 @@ def arc_calc(obj):
     '''
     Calculates direction of curve and offset values for a given arc or circle.
     Parameters:
-        obj (guid): objectGUID of the curve to calculate
+        obj (guid|Curve): objectGUID or curve geometry to calculate
     Returns:
         gcode_direction (string): Returning G02 or G03 depending on clockwise or counterclockwise
-        x_offset (Decimal): How long to offset in x-direction
-        y_offset (Decimal): How long to offset in y-direction
+        x_offset (float): How long to offset in x-direction
+        y_offset (float): How long to offset in y-direction
     '''
 
-    context = getcontext()
-    # Setting decimal precision
-    context.prec = 28
-
     # Circle/Arc direction
     gcode_direction = ''
 
-    # Getting centre points
-    if rs.IsArc(obj) and not rs.IsCircle(obj):
-        center_point = rs.ArcCenterPoint(obj)
-    elif not rs.IsArc(obj) and rs.IsCircle(obj):
-        center_point = rs.CircleCenterPoint(obj)
+    # Curve geometry is fetched once and read directly from here on
+    curve = rs.coercecurve(obj)
+    is_circle = rs.IsCircle(curve)
 
-    offset_vector = rs.VectorCreate(rs.CurveStartPoint(obj), center_point)
-    offset_length = Decimal(rs.VectorLength(offset_vector))
+    # Getting centre points
+    if is_circle:
+        center_point = rs.CircleCenterPoint(curve)
+    else:
+        center_point = rs.ArcCenterPoint(curve)
 
-    # Create midpoint on curve to evaluate directionality of curve
-    if rs.IsCircle(obj):
-        mid_point = rs.DivideCurve(obj, 4)
+    start_point = curve.PointAtStart
+    offset_vector = rs.VectorCreate(start_point, center_point)
 
-    elif rs.IsArc(obj):
-        mid_point = rs.DivideCurve(obj, 2)
+    # Create point a quarter along a circle, or halfway along an arc,
+    # to evaluate directionality of curve
+    mid_point = curve.PointAtNormalizedLength(0.25 if is_circle else 0.5)
 
     # Create vector and cross-product
-    mid_vector = rs.VectorCreate(mid_point[1], center_point)
-    mid_vector_cross_product = Decimal(rs.VectorCrossProduct(offset_vector, mid_vector)[2])
-
-    # Getting rid of -0.00 situations
-    try:
-        mid_vector_cross_product = context.divide(
-            context.abs(mid_vector_cross_product),
-            mid_vector_cross_product
-            )
-    except:
-        # Tried 0/0: We need either +1 or -1 as a result
-        # 0/0 should then be counted as +1
-        mid_vector_cross_product = Decimal('1')
+    mid_vector = rs.VectorCreate(mid_point, center_point)
+    mid_vector_cross_product = rs.VectorCrossProduct(offset_vector, mid_vector)[2]
 
-    # If the angle between start and end point has negative cross_productuct,
+    # If the angle between start and end point has positive cross_product,
     # then use G03 (counterclockwise movement).
-    # Else use the G02 clockwise movement
-    if mid_vector_cross_product > 0:
+    # Else use the G02 clockwise movement.
+    # A zero cross_product (including -0.00) counts as positive.
+    if mid_vector_cross_product >= 0:
         gcode_direction = 'G03'
     else :
         gcode_direction = 'G02'
 
-    # Calculate angle in degrees between offset and worldX and get the cross product.
-    offset_angle = Decimal(rs.VectorAngle(offset_vector, WORLD_X_VECTOR))
-    # Get Z component from cross_productVector
-    cross_product = Decimal(rs.VectorCrossProduct(offset_vector, WORLD_X_VECTOR)[2])
-
-    try:  # Getting rid of -0.00 situations
-        cross_product = context.divide(
-            context.abs(cross_product),
-            cross_product
-            )
-    except:
-        # Tried 0/0: We need either +1 or -1 as a result
-        # 0/0 will then be counted as +1
-        cross_product = 1
-
-    # The initial angle will always be 0<angle<180 thus we must use the cross-product
-    # to increase this to a full 360 circle.
-    if cross_product < 0:
-        offset_angle = 360 - offset_angle
-
-    #===========================================================================
-    # Calculating offset X and Y components
-    # WARNING THIS HAS ISSUES WITH FLOATING POINT ARITHMETICS
-    # Floating point arithmetic causes things like Cos(0deg) = 0.000000003245312
-    # which is NOT EQUAL 0
-    #===========================================================================
-    cos = Decimal(math.cos(math.radians(offset_angle)))
-    sin = Decimal(math.sin(math.radians(offset_angle)))
-    # Workaround for some floating point arithmetic issues
-    if sin == 1.00 or sin == -1.00:
-        cos = 0.00
-    if cos == 1.00 or cos == -1.00:
-        sin = 0.00
-
-    # Calculate offset magnitude in X and Y. Reverse X to get correct movement
-    x_offset = Decimal(cos) * Decimal(offset_length) * Decimal('-1')
-    y_offset = Decimal(sin) * Decimal(offset_length)
+    # The I and J offsets point from the start point to the centre
+    x_offset = center_point[0] - start_point[0]
+    y_offset = center_point[1] - start_point[1]
 
     return gcode_direction, x_offset, y_offset
 
@@ -825,77 +909,61 @@ def convert_to_lines(curve_guid):
 
 def gcode_process_lines(curve_guid, polylines=False, skip_start=False, skip_end=False):
 
-    gcode = ''
+    gcode = []
 
     if skip_start == False:
-        gcode += ('\n' + 'G00'
-                  + ' X' + str(Decimal(rs.CurveStartPoint(curve_guid)[0]).quantize(ROUNDING))
-                  + ' Y' + str(Decimal(rs.CurveStartPoint(curve_guid)[1]).quantize(ROUNDING))
-                  + '\nM12\n')
+        start_point = rs.CurveStartPoint(curve_guid)
+        gcode.append(_G00_TEMPLATE % (start_point[0], start_point[1]))
 
     if polylines == True:
 
-        #Attempting exploding polyline
-        sub_curves = rs.ExplodeCurves(curve_guid)
-
-        if sub_curves:
-            for sub in sub_curves:
-                gcode += ('G01'
-                          + ' X' + str(Decimal(rs.CurveEndPoint(sub)[0]).quantize(ROUNDING))
-                          + ' Y' + str(Decimal(rs.CurveEndPoint(sub)[1]).quantize(ROUNDING))
-                          + '\n')
-                # Delete exploded segments to avoid duplicates
-                if not rs.DeleteObject(sub):
-                    print('Unable to delete exploded curve segment')
-        else:
-            #If the polyline is only 1 segment and cannot be exploded
-            gcode += ('G01'
-                      + ' X' + str(Decimal(rs.CurveEndPoint(curve_guid)[0]).quantize(ROUNDING))
-                      + ' Y' + str(Decimal(rs.CurveEndPoint(curve_guid)[1]).quantize(ROUNDING))
-                      + '\n')
+        # Reading every vertex in one call instead of exploding the polyline
+        # into segments that have to be added to and deleted from the document.
+        # Only polylines and curves converted to polylines are passed here.
+        vertices = rs.PolylineVertices(curve_guid)
+
+        # The first vertex is the start point, every other vertex ends a segment
+        gcode.extend([_G01_TEMPLATE % (vertex[0], vertex[1]) for vertex in vertices[1:]])
 
     elif polylines == False:
-        gcode += ('G01'
-                  + ' X' + str(Decimal(rs.CurveEndPoint(curve_guid)[0]).quantize(ROUNDING))
-                  + ' Y' + str(Decimal(rs.CurveEndPoint(curve_guid)[1]).quantize(ROUNDING))
-                  + '\n')
+        end_point = rs.CurveEndPoint(curve_guid)
+        gcode.append(_G01_TEMPLATE % (end_point[0], end_point[1]))
 
     if skip_end == False:
-        gcode += ('M22\n')
+        gcode.append('M22\n')
 
-    return gcode
+    return ''.join(gcode)
 
 
 def gcode_process_curves(curve_object, polycurves=False):
-    gcode = ''
+    gcode = []
 
-    gcode += ('\n' + 'G00'
-              + ' X' + str(Decimal(curve_object.start_point[0]).quantize(ROUNDING))
-              + ' Y' + str(Decimal(curve_object.start_point[1]).quantize(ROUNDING))
-              + '\nM12\n')
+    gcode.append(_G00_TEMPLATE % (curve_object.start_point[0], curve_object.start_point[1]))
 
     if polycurves == True:
 
-        sub_curves = rs.ExplodeCurves(curve_object.guid)
+        # Segments are duplicated as geometry only, so nothing is added to
+        # or deleted from the document while processing them
+        sub_curves = rs.coercecurve(curve_object.guid).DuplicateSegments()
+
+        # Functions used for every segment are looked up once
+        is_arc = rs.IsArc
+        is_line = rs.IsLine
 
+        # Polylines converted from NURBS segments, deleted together afterwards
+        converted_curves = []
 
         for sub in sub_curves:
-            if rs.IsArc(sub):
+            if is_arc(sub):
                 gcode_direction, x_offset, y_offset = arc_calc(sub)
+                end_point = sub.PointAtEnd
 
-                gcode += str(gcode_direction
-                             + ' X' + str(Decimal(rs.CurveEndPoint(sub)[0]).quantize(ROUNDING))
-                             + ' Y' + str(Decimal(rs.CurveEndPoint(sub)[1]).quantize(ROUNDING))
-                             + ' I' + str(Decimal(x_offset).quantize(ROUNDING))
-                             + ' J' + str(Decimal(y_offset).quantize(ROUNDING))
-                             + '\n')
+                gcode.append(_ARC_TEMPLATE % (gcode_direction, end_point[0], end_point[1], x_offset, y_offset))
 
-            elif rs.IsLine(sub):
+            elif is_line(sub):
+                end_point = sub.PointAtEnd
 
-                gcode += ('G01'
-                      + ' X' + str(Decimal(rs.CurveEndPoint(sub)[0]).quantize(ROUNDING))
-                      + ' Y' + str(Decimal(rs.CurveEndPoint(sub)[1]).quantize(ROUNDING))
-                      + '\n')
+                gcode.append(_G01_TEMPLATE % (end_point[0], end_point[1]))
 
             else:
                 # Sub segment is NURBS
@@ -904,80 +972,94 @@ def gcode_process_curves(curve_object, polycurves=False):
 
                 if converted_curve_guid:
                     # Getting G-code from polyline
-                    gcode += gcode_process_lines(converted_curve_guid, polylines=True, skip_start=True, skip_end=True)
+                    gcode.append(gcode_process_lines(converted_curve_guid, polylines=True, skip_start=True, skip_end=True))
+                    converted_curves.append(converted_curve_guid)
 
-                    # Deleting polyline from document as we don't need it
-                    if rs.DeleteObject(converted_curve_guid) != True:
-                        print('Could not delete object')
-            if rs.DeleteObject(sub) != True:
-                print('Could not delete object')
+        # Deleting polylines from document as we don't need them
+        if converted_curves and rs.DeleteObjects(converted_curves) != len(converted_curves):
+            print('Could not delete object')
 
     else:
-        if rs.IsArc(curve_object.guid):
+        if curve_object.curve_type == 'arc':
             gcode_direction, x_offset, y_offset = arc_calc(curve_object.guid)
 
             # G02/G03 [x][y][z]|[i][j][k]
-            gcode += str(gcode_direction
-                        + ' X' + str(Decimal(curve_object.end_point[0]).quantize(ROUNDING))
-                        + ' Y' + str(Decimal(curve_object.end_point[1]).quantize(ROUNDING))
-                        + ' I' + str(Decimal(x_offset).quantize(ROUNDING))
-                        + ' J' + str(Decimal(y_offset).quantize(ROUNDING))
-                        + '\n')
-
-        elif rs.IsCircle(curve_object.guid):
+            gcode.append(_ARC_TEMPLATE % (gcode_direction, curve_object.end_point[0], curve_object.end_point[1], x_offset, y_offset))
+
+        elif curve_object.curve_type == 'circle':
             #===================================================================
-            # WARNING: 
-            # Currently struggling with floating point errors.
-            # If start_point + offset - center_point NOT EQUAL 0:
-            #     Both GO2 and G03 will fail
-            # To work around this, the function will divide the circle in two arcs
-            # and work from there. 
+            # A full circle in one G02/G03 move suffered from floating point
+            # errors, so the circle is cut as two half arcs. The point opposite
+            # the start point is calculated from the centre, so the second arc
+            # ends exactly where the first began.
             #===================================================================
 
-            curve_domain = rs.CurveDomain(curve_object.guid)
-            #Split circle in two arcs
-            sub_curves = rs.SplitCurve(curve_object.guid, curve_domain[1] / 2, delete_input=False)
+            circle_orientation = rs.coercecurve(curve_object.guid).ClosedCurveOrientation(Rhino.Geometry.Vector3d.ZAxis)
+            if circle_orientation == Rhino.Geometry.CurveOrientation.Clockwise:
+                gcode_direction = 'G02'
+            else:
+                gcode_direction = 'G03'
 
-            for sub in sub_curves:
-                gcode_direction, x_offset, y_offset = arc_calc(sub)
+            start_x, start_y = curve_object.start_point[0], curve_object.start_point[1]
+            center_x, center_y = curve_object.center_point[0], curve_object.center_point[1]
+            opposite_x = 2 * center_x - start_x
+            opposite_y = 2 * center_y - start_y
 
-                # G02/G03 [x][y][z]|[i][j][k]
-                gcode += str(gcode_direction
-                             + ' X' + str(Decimal(rs.CurveEndPoint(sub)[0]).quantize(ROUNDING))
-                             + ' Y' + str(Decimal(rs.CurveEndPoint(sub)[1]).quantize(ROUNDING))
-                             + ' I' + str(Decimal(x_offset).quantize(ROUNDING))
-                             + ' J' + str(Decimal(y_offset).quantize(ROUNDING))
-                             + '\n')
+            # G02/G03 [x][y][z]|[i][j][k]
+            gcode.append(_ARC_TEMPLATE % (gcode_direction, opposite_x, opposite_y,
+                                          center_x - start_x, center_y - start_y))
+            gcode.append(_ARC_TEMPLATE % (gcode_direction, start_x, start_y,
+                                          center_x - opposite_x, center_y - opposite_y))
 
-                last_entry = (rs.CurveEndPoint(sub)[0], rs.CurveEndPoint(sub)[1])
+    gcode.append('M22\n')
 
-                if not rs.DeleteObject(sub):
-                    print('Unable to delete split curve segment')
+    return ''.join(gcode)
 
-            # If there are any rounding errors and the end point of the last arc
-            # is not the same as the start point of the first arc, create a line.
-            if (((Decimal(last_entry[0]).quantize(ROUNDING))
-                != Decimal(curve_object.start_point[0]).quantize(ROUNDING)) or
-                ((Decimal(last_entry[1]).quantize(ROUNDING))
-                != Decimal(curve_object.start_point[1]).quantize(ROUNDING))):
 
-                gcode += ('\n' + 'G01'
-                          + ' X' + str(Decimal(curve_object.start_point[0]).quantize(ROUNDING))
-                          + ' Y' + str(Decimal(curve_object.start_point[1]).quantize(ROUNDING))
-                          )
+def gcode_process_converted(curve_object):
+    '''
+    Creates G-code for a curve by first reducing it to a polyline.
+    Parameters:
+        curve_object (CurveObject): Ellipse or NURBS curve to process
+    Returns:
+        gcode (string): G-code for the curve, None if it could not be converted
+    '''
+
+    # Converting curve to polyline
+    converted_curve_guid = convert_to_lines(curve_object.guid)
+
+    if not converted_curve_guid:
+        return None
+
+    # Getting G-code from polyline
+    gcode = gcode_process_lines(converted_curve_guid, polylines=True)
 
-    gcode += ('M22\n')
+    # Deleting polyline from document as we don't need it
+    if rs.DeleteObject(converted_curve_guid) != True:
+        print('Could not delete object')
 
     return gcode
 
 
+# G-code handler and counted statistic for each type of CurveObject
+_CURVE_HANDLERS = {
+    'ellipse': (gcode_process_converted, 'curve'),
+    'circle': (lambda curve_object: gcode_process_curves(curve_object, polycurves=False), 'curve'),
+    'arc': (lambda curve_object: gcode_process_curves(curve_object, polycurves=False), 'curve'),
+    'curve': (gcode_process_converted, 'curve'),
+    'polycurve': (lambda curve_object: gcode_process_curves(curve_object, polycurves=True), 'polycurve'),
+    'polyline': (lambda curve_object: gcode_process_lines(curve_object.guid, polylines=True), 'polyline'),
+    'line': (lambda curve_object: gcode_process_lines(curve_object.guid, polylines=False), 'line'),
+}
+
+
 def gcode_from_objects(object_list):
     '''
     Function creates gcode from a list of CurveObjects.
     Parameters:
         object_list (CurveObject): List of CurveObjects to evaluate.
     Returns:
-        gcode(string): String containing all gcode information processed.
+        gcode(list): G-code strings for each processed curve, in cutting order.
         processed_curve (int): Number of curves processed.
         processed_line (int): Number of lines processed.
         active_length (float): Total distance the laser move and be active cutting / engraving.
@@ -985,7 +1067,7 @@ def gcode_from_objects(object_list):
 
     Notes:
         Ellipse: Processed as series of line segments.
-        Circle: Processed as two separate arcs, back to back (This to workaround floating point issues).
+        Circle: Processed as two half arcs, back to back.
         Arcs: Processed as arcs, using G02 or G03 circular movement.
         NURBS: Processed as series of line segments.
         Polycurve: Split into sub-curves where sub-curves are processed as arcs.
@@ -996,118 +1078,70 @@ def gcode_from_objects(object_list):
     print('Getting G-code from objects')
 
     #Statistics
-    processed_curve = 0
-    processed_polycurve = 0
-    processed_polyline = 0
-    processed_line = 0
+    processed = {'curve': 0, 'polycurve': 0, 'polyline': 0, 'line': 0}
 
     active_length = 0
     passive_length = 0
-    previous_position = [0,0,0]
+    previous_position = [0,0]
     
     unprocessed_curves = []
 
-    gcode = ''
+    gcode = []
 
-    percent_update = 1 / len(object_list) * 100
+    object_count = len(object_list)
     status_bar = 0
     rs.StatusBarProgressMeterShow('Processing curves', 0, 100, embed_label=False, show_percent=True)
 
-    for obj in object_list:
-
-        if obj.curve_type == 'ellipse':
+    # Looked up once instead of for every object
+    curve_handlers = _CURVE_HANDLERS
+    gcode_append = gcode.append
 
-            # Converting curve to polyline
-            converted_curve_guid = convert_to_lines(obj.guid)
+    for index, obj in enumerate(object_list):
 
-            if converted_curve_guid:
-                # Getting G-code from polyline
-                gcode += gcode_process_lines(converted_curve_guid, polylines=True)
+        handler, statistic = curve_handlers[obj.curve_type]
+        curve_gcode = handler(obj)
 
-                # Deleting polyline from document as we don't need it
-                if rs.DeleteObject(converted_curve_guid) != True:
-                    print('Could not delete object')
-
-                # Add statistics
-                processed_curve += 1
-                active_length += rs.CurveLength(obj.guid)
-
-            else:
-                unprocessed_curves.append(obj)
-
-
-        elif obj.curve_type == 'circle':
-
-            gcode += gcode_process_curves(obj, polycurves=False)
-
-            # Add statistics
-            processed_curve += 1
-            active_length += rs.CurveLength(obj.guid)
-
-        if obj.curve_type == 'arc':
-
-            gcode += gcode_process_curves(obj, polycurves=False)
+        if curve_gcode:
+            gcode_append(curve_gcode)
 
             # Add statistics
-            processed_curve += 1
-            active_length += rs.CurveLength(obj.guid)
-
-        elif obj.curve_type == 'curve':
-
-            # Converting curve to polyline
-            converted_curve_guid = convert_to_lines(obj.guid)
-
-            if converted_curve_guid:
-                # Getting G-code from polyline
-                gcode += gcode_process_lines(converted_curve_guid, polylines=True)
-
-                # Deleting polyline from document as we don't need it
-                if rs.DeleteObject(converted_curve_guid) != True:
-                    print('Could not delete object')
-
-                # Add statistics
-                processed_curve += 1
-                active_length += rs.CurveLength(obj.guid)
-
-            else:
-                unprocessed_curves.append(obj)
-
-
-        elif obj.curve_type == 'polycurve':
-
-            gcode += gcode_process_curves(obj, polycurves=True)
+            processed[statistic] += 1
+            active_length += obj.length
 
-            # Add statistics
-            processed_polycurve += 1
-            active_length += rs.CurveLength(obj.guid)
-
-        elif obj.curve_type == 'polyline':
-
-            gcode += gcode_process_lines(obj.guid, polylines=True)
-
-            # Add statistics
-            processed_polyline += 1
-            active_length += rs.CurveLength(obj.guid)
+        else:
+            unprocessed_curves.append(obj)
 
-        elif obj.curve_type == 'line':
+        # Statistics and movement
+        # All curves lie in world XY, so the move is measured in the plane
+        passive_length += math.hypot(obj.start_point[0] - previous_position[0],
+                                     obj.start_point[1] - previous_position[1])
+        previous_position = obj.end_point
 
-            gcode += gcode_process_lines(obj.guid, polylines=False)
+        # Only redraw the progress bar when it moves a whole percent
+        percent = (index + 1) * 100 // object_count
+        if percent != status_bar:
+            status_bar = percent
+            rs.StatusBarProgressMeterUpdate(status_bar, absolute=True)
 
-            # Add statistics
-            processed_line += 1
-            active_length += rs.CurveLength(obj.guid)
+    return (gcode, processed['curve'], processed['polycurve'], processed['polyline'],
+            processed['line'], active_length, passive_length, unprocessed_curves)
 
-        # Statistics and movement
-        passive_move_vector = rs.VectorCreate(obj.start_point, previous_position)
-        passive_length += rs.VectorLength(passive_move_vector)
-        previous_position = obj.end_point
 
-        status_bar += percent_update
-        rs.StatusBarProgressMeterUpdate(status_bar, absolute=True)
+def process_layer(object_list, material_data):
+    '''
+    Sorts the CurveObjects of one layer and creates G-code from them.
+    Parameters:
+        object_list (list): Interpreted CurveObjects, None or empty if the layer has none
+        material_data (dict): Material profile used for sorting
+    Returns:
+        Same values as gcode_from_objects. Without objects the G-code and
+        counts are None, the lengths 0 and the list of unprocessed curves empty.
+    '''
 
-    rs.StatusBarProgressMeterUpdate(100, absolute=True)
+    if not object_list:
+        return None, None, None, None, None, 0, 0, []
 
-    return gcode, processed_curve, processed_polycurve, processed_polyline, processed_line, active_length, passive_length, unprocessed_curves
+    return gcode_from_objects(sort_advanced(object_list, material_data))
 
 
 def run_script():
@@ -1128,15 +1162,10 @@ def run_script():
 
     # Initialise variables
     cut_out_of_bounds = 0
-    cut_skipped_objects = 0
-
     engrave_out_of_bounds = 0
-    engrave_skipped_objects = 0
 
     cut_objects_skipped_list = []
     engrave_objects_skipped_list = []
-    cut_failed_convert = []
-    engrave_failed_convert = []
 
     # Disabling document screen updating when processing
     rs.EnableRedraw(False)
@@ -1232,30 +1261,28 @@ def run_script():
 
     if objects_engrave != None:
         #If there are any objects from engrave layer -> sort them
-        objects_engrave, engrave_out_of_bounds, engrave_skipped_objects, engrave_objects_skipped_list = interpret_curves(objects_engrave)
+        objects_engrave, engrave_out_of_bounds, engrave_objects_skipped_list = interpret_curves(objects_engrave)
+        if objects_engrave is None:
+            # User chose to exit and fix a curve manually
+            return 2, engrave_objects_skipped_list
     else:
         objects_engrave = None
 
     if objects_cut != None:
         # If there are any objects from cutting layer -> parse and interpret them
-        objects_cut, cut_out_of_bounds, cut_skipped_objects, cut_objects_skipped_list = interpret_curves(objects_cut)
+        objects_cut, cut_out_of_bounds, cut_objects_skipped_list = interpret_curves(objects_cut)
+        if objects_cut is None:
+            # User chose to exit and fix a curve manually
+            return 2, cut_objects_skipped_list
     else:
         objects_cut = None
 
-    # Count skipped objects and give option to exit program if any found
+    # Count objects out of bounds and give option to exit program if any found
     total_out_of_bounds = cut_out_of_bounds + engrave_out_of_bounds
-    total_skipped_objects = cut_skipped_objects + engrave_skipped_objects
-
-    if total_out_of_bounds > 0 or total_skipped_objects > 0:
-        message_1 = ''
-        message_2 = ''
-
-        if total_out_of_bounds > 0:
-            message_1 = '%o objects was found to be outside of workable area.' % total_out_of_bounds
-        if total_skipped_objects > 0:
-            message_2 = '%o objects was skipped. Previous dialogue may have informed why. If not the reason is unknown. ' % total_skipped_objects
 
-        complete_message = message_1 + '\n' + message_2 + '\nExit script and manually fix errors?'
+    if total_out_of_bounds > 0:
+        complete_message = ('%d objects was found to be outside of workable area.' % total_out_of_bounds
+                            + '\nExit script and manually fix errors?')
 
         message = rs.MessageBox(complete_message, 4 | 48 | 0, 'ERROR: Unprocessed objects')
         if message == 6:
@@ -1269,60 +1296,22 @@ def run_script():
             pass
 
     #===========================================================================
-    # Sorting interpreted curve objects
+    # Sort interpreted curve objects, get Gcode and statistics
     #===========================================================================
 
-    
-    # Sorting objects_engrave
-    if objects_engrave != None:
-        #If there are any objects interpreted -> sort them
-        objects_engrave = sort_advanced(objects_engrave, material_data)
-    else:
-        objects_engrave = None
-
-    # Sorting objects_cut
-    if objects_cut != None:
-        # If there are any objects interpreted -> sort them
-        objects_cut = sort_advanced(objects_cut, material_data)
-    else:
-        objects_cut = None
-
-
-    #===========================================================================
-    # Get Gcode and statistics
-    #===========================================================================
+    (gcode_engrave, curves_engraved, polycurves_engraved, polylines_engraved, lines_engraved,
+     length_engraved_active, length_engraved_passive, engrave_failed_convert) = process_layer(objects_engrave, material_data)
 
-    if objects_engrave != None:
-        # Getting gcode_engrave and statistics
-        gcode_engrave, curves_engraved, polycurves_engraved, polylines_engraved, lines_engraved, length_engraved_active, length_engraved_passive, engrave_failed_convert = gcode_from_objects(objects_engrave)
-    else:
-        gcode_engrave = None
-        curves_engraved = None
-        polycurves_engraved = None
-        polylines_engraved = None
-        lines_engraved = None
-        length_engraved_active = 0
-        length_engraved_passive = 0
+    (gcode_cut, curves_cut, polycurves_cut, polylines_cut, lines_cut,
+     length_cut_active, length_cut_passive, cut_failed_convert) = process_layer(objects_cut, material_data)
 
-    if objects_cut != None:
-        # Getting gcode_cut and statistics
-        gcode_cut, curves_cut, polycurves_cut, polylines_cut, lines_cut, length_cut_active, length_cut_passive, cut_failed_convert = gcode_from_objects(objects_cut)
-    else:
-        gcode_cut = None
-        curves_cut = None
-        polycurves_cut = None
-        polylines_cut = None
-        lines_cut = None
-        length_cut_active = 0
-        length_cut_passive = 0
-
-    if (engrave_failed_convert.__len__() + cut_failed_convert.__len__()) > 0:
-        failed_convert_total = engrave_failed_convert + cut_failed_convert
-        message = rs.MessageBox('Unable to convert %s curves to polylines' % failed_convert_total.__len__()
+    failed_convert_count = len(engrave_failed_convert) + len(cut_failed_convert)
+    if failed_convert_count > 0:
+        message = rs.MessageBox('Unable to convert %s curves to polylines' % failed_convert_count
                                 + '\nExit and fix curves manually?',
                       4 | 48 | 0, 'ERROR: Unprocessed objects')
         if message == 6:
-            return 2, failed_convert_total
+            return 2, engrave_failed_convert + cut_failed_convert
         else:
             pass
 
@@ -1334,65 +1323,69 @@ def run_script():
     # Concatenate final gCode
     #===========================================================================
 
-    summary = ('Settings server: \n' + server_data['Name'] + '\n\n'
-               + 'Original Rhino file name: ' + str(rs.DocumentName()) + '\n')
+    summary_parts = ['Settings server: \n' + server_data['Name'] + '\n\n'
+                     + 'Original Rhino file name: ' + str(rs.DocumentName()) + '\n']
     if layer_name_engrave:
-        summary += ('Selected engraving layer: ' + str(layer_name_engrave) + '\n')
+        summary_parts.append('Selected engraving layer: ' + str(layer_name_engrave) + '\n')
 
     if layer_name_cut:
-        summary += ('Selected cutting layer: ' + str(layer_name_cut) + '\n')
+        summary_parts.append('Selected cutting layer: ' + str(layer_name_cut) + '\n')
 
-    summary += ('Generation date and time: ' + str(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')) + '\n'
-                + 'Selected material profile: ' + str(material_data['MaterialName']) + '\n\n')
+    summary_parts.append('Generation date and time: ' + str(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')) + '\n'
+                         + 'Selected material profile: ' + str(material_data['MaterialName']) + '\n\n')
 
     if gcode_engrave:
         if curves_engraved:
-            summary += ('Engraving curves processed: ' + str(curves_engraved) + '\n')
+            summary_parts.append('Engraving curves processed: ' + str(curves_engraved) + '\n')
         if polycurves_engraved:
-            summary += ('Engraving polycurves processed: ' + str(polycurves_engraved) + '\n')
+            summary_parts.append('Engraving polycurves processed: ' + str(polycurves_engraved) + '\n')
         if polylines_engraved:
-            summary += ('Engraving polylines processed: ' + str(polylines_engraved) + '\n')
+            summary_parts.append('Engraving polylines processed: ' + str(polylines_engraved) + '\n')
         if lines_engraved:
-            summary += ('Engraving lines processed: ' + str(lines_engraved) + '\n')
+            summary_parts.append('Engraving lines processed: ' + str(lines_engraved) + '\n')
 
-        summary += ('Total engraving length: ' + str(int(length_engraved_active)) + ' mm\n'
-                    + 'Engraving Time: ' + str(datetime.timedelta(seconds=int(duration_engrave))) + '\n\n')
+        summary_parts.append('Total engraving length: ' + str(int(length_engraved_active)) + ' mm\n'
+                             + 'Engraving Time: ' + str(datetime.timedelta(seconds=int(duration_engrave))) + '\n\n')
 
     if gcode_cut:
         if curves_cut:
-            summary += ('Cutting curves processed: ' + str(curves_cut) + '\n')
+            summary_parts.append('Cutting curves processed: ' + str(curves_cut) + '\n')
         if polycurves_cut:
-            summary += ('Cutting polycurves processed: ' + str(polycurves_cut) + '\n')
+            summary_parts.append('Cutting polycurves processed: ' + str(polycurves_cut) + '\n')
         if polylines_cut:
-            summary += ('Cutting polylines processed: ' + str(polylines_cut) + '\n')
+            summary_parts.append('Cutting polylines processed: ' + str(polylines_cut) + '\n')
         if lines_cut:
-            summary += ('Cutting lines processed: ' + str(lines_cut) + '\n')
+            summary_parts.append('Cutting lines processed: ' + str(lines_cut) + '\n')
+
+        summary_parts.append('Total cutting length: ' + str(int(length_cut_active)) + ' mm\n'
+                             + 'Cutting Time: ' + str(datetime.timedelta(seconds=int(duration_cut))) + '\n\n')
 
-        summary += ('Total cutting length: ' + str(int(length_cut_active)) + ' mm\n'
-                    + 'Cutting Time: ' + str(datetime.timedelta(seconds=int(duration_cut))) + '\n\n')
+    summary_parts.append('Skipped out of bounds objects: ' + str(total_out_of_bounds) + '\n\n'
+                         + 'Total estimated time to run this file: ' + str(datetime.timedelta(seconds=int(duration_total))) + '\n\n'
+                         + 'Script ' +  str(SCRIPT_VERSION) + ' by Andreas Weibye (AB)\nNTNU Trondheim - www.ntnu.edu')
 
-    summary += ('Skipped objects: ' + str(total_skipped_objects) + '\n'
-                + 'Skipped out of bounds objects: ' + str(total_out_of_bounds) + '\n\n'
-                + 'Total estimated time to run this file: ' + str(datetime.timedelta(seconds=int(duration_total))) + '\n\n'
-                + 'Script ' +  str(SCRIPT_VERSION) + ' by Andreas Weibye (AB)\nNTNU Trondheim - www.ntnu.edu')
+    summary = ''.join(summary_parts)
 
-    gcode_mid = ''
+    gcode_mid = []
 
     # Checking if engraveGcode has any info. If yes, adding Gcode for engraving
     if gcode_engrave != None:
-        gcode_mid += ('\n(Engraving commands)\n'
-                      + 'G97 S' + str(material_data['EngravingPower']) + '\n'
-                      + 'G98 P265 E' + str(material_data['EngravingPulse']) + '\n'
-                      + 'G01 F' + str(material_data['EngravingSpeed']) + '\n'
-                      + str(gcode_engrave) + '\n')
+        gcode_mid.append('\n(Engraving commands)\n'
+                         + 'G97 S' + str(material_data['EngravingPower']) + '\n'
+                         + 'G98 P265 E' + str(material_data['EngravingPulse']) + '\n'
+                         + 'G01 F' + str(material_data['EngravingSpeed']) + '\n')
+        # G-code for each curve is kept as it is, only copied once in the final join
+        gcode_mid.extend(gcode_engrave)
+        gcode_mid.append('\n')
 
     # Checking if gcode_cut has any info. If yes, adding Gcode for cutting
     if gcode_cut != None:
-        gcode_mid += ('\n(Cutting commands)\n'
-                      + 'G97 S' + str(material_data['CuttingPower']) + '\n'
-                      + 'G98 P265 E' + str(material_data['CuttingPulse']) + '\n'
-                      + 'G01 F' + str(material_data['CuttingSpeed']) + '\n'
-                      + str(gcode_cut) + '\n')
+        gcode_mid.append('\n(Cutting commands)\n'
+                         + 'G97 S' + str(material_data['CuttingPower']) + '\n'
+                         + 'G98 P265 E' + str(material_data['CuttingPulse']) + '\n'
+                         + 'G01 F' + str(material_data['CuttingSpeed']) + '\n')
+        gcode_mid.extend(gcode_cut)
+        gcode_mid.append('\n')
 
     # Checking if server-settings are putting machine in relative circle movement,
     # if not: set it.
@@ -1412,7 +1405,7 @@ def run_script():
     gcode_end = ('(Shutdown commands) \n' + str(server_data['End']))
 
     # Concatenating final G-code
-    gcode_final = gcode_start + gcode_mid + gcode_end
+    gcode_final = ''.join([gcode_start] + gcode_mid + [gcode_end])
 
     # Add G-code to Notes in Rhino Document
     rs.Notes(newnotes=gcode_final)
@@ -1427,21 +1420,22 @@ def run_script():
         print('User exited save file dialogue')
         return 3, None
 
-    final_file = open(save_file, 'w')
+    # The complete G-code is already in memory for the document notes,
+    # so it is written in one call through a large buffer
+    try:
+        with open(save_file, 'w', 1 << 20) as final_file:
+            final_file.write(gcode_final)
+    except IOError as e:
+        rs.MessageBox('Unable to save file\n' + str(e), 0, 'Error')
+        return 1, None
 
-    if final_file is None:
-        return 4, None
+    # Check if file was created
+    if os.path.exists(save_file):
+        # TODO: Check if file is larger than 0bytes
+        print('File saved successfully')
     else:
-        final_file.write(gcode_final)
-        final_file.close()
-
-        # Check if file was created
-        if os.path.exists(save_file):
-            # TODO: Check if file is larger than 0bytes
-            print('File saved successfully')
-        else:
-            rs.MessageBox('Unable to save file', 0, 'Error')
-            return 3, None
+        rs.MessageBox('Unable to save file', 0, 'Error')
+        return 3, None
 
     rs.MessageBox(summary, 0, title='File summary')
 
@@ -1468,9 +1462,8 @@ if (__name__ == '__main__'):
     elif exit_code == 2:
         print('Program exit: User chose to exit script')
             
-        if exit_objects_to_be_selected is not None:
-            if ((exit_objects_to_be_selected.__len__() != 0)):
-                rs.SelectObjects(exit_objects_to_be_selected)
+        if exit_objects_to_be_selected:
+            rs.SelectObjects(exit_objects_to_be_selected)
     elif exit_code == 3:
         print('Program exit: User exited dialogue screen')
     elif exit_code == 4:
@@ -1,7 +1,6 @@
 import json
-import urllib
+import urllib2
 import rhinoscriptsyntax as rs
-import rhinoscript
 import Rhino
 import scriptcontext
 import datetime
@@ -10,14 +9,29 @@ import datetime
 
 url = 'http://www.ntnu.no/ab/digilab/Web/laser.json'
 plugin_version = 1.0
+url_timeout = 10 # Seconds to wait for the settings server
+
+# G-code line formats, coordinates rounded to three decimals
+G00_FORMAT = "G00 X%.3f Y%.3f"
+G01_FORMAT = "G01 X%.3f Y%.3f"
+
+# Opener is built once and reused for every request
+url_opener = urllib2.build_opener()
 
 __commandname__ = "laser"
 
+DEBUG = False # Print progress messages to the command line
+
+def log(message):
+    # Progress messages are only printed when debugging
+    if DEBUG:
+        print message
+
 
 def fetch_from_url(url):
-    print "Fetching Settings from Server"
+    log("Fetching Settings from Server")
     try:
-        json_data = urllib.urlopen(url)
+        json_data = url_opener.open(url, timeout=url_timeout)
     except: 
         rs.MessageBox("Cannot connect to online laser settings - are you sure you are online?", 0)
         return False
@@ -29,22 +43,21 @@ def fetch_from_url(url):
         return False
 
     json_data.close()
+
+    # Index of every material by name, for looking up the user's choice
+    data["_material_index"] = dict((m["MaterialName"], i) for i, m in enumerate(data["Materials"]))
     return data
 
 def list_materials(data, title = "Choose material"):
-    print "Generating material list from server"
-    material_index = 0
-    items = [data["Materials"][i]["MaterialName"] for i in range(len(data["Materials"]))] 
+    log("Generating material list from server")
+    items = [m["MaterialName"] for m in data["Materials"]]
     material = rs.GetString(title, None, items)
-    for i in range(len(data["Materials"])):
-        if material == data["Materials"][i]["MaterialName"]:
-            material_index = i
-        elif material == None:
-            return None
-    return material_index
+    if material == None:
+        return None
+    return data["_material_index"].get(material, 0)
 
 def approve_unit_system():
-    print "Checking system units"
+    log("Checking system units")
     if rs.UnitSystem() != 2:
         unit_system = rs.MessageBox("The document\'s unit system has to be set to millimeters because that is the only thing the laser knows how to read.\
         \n\nThis can be done with auto-scaling (if you have designed with other units) or by converting only (if everything is meants to be in mm, but the units are just wrong) \
@@ -62,66 +75,41 @@ def approve_unit_system():
     return True
 
 def bounding_box(ob):
-    """Returns bounding box for an object."""
+    """Returns bounding box for curve geometry."""
     if ob:
-        bbox = rs.BoundingBox(ob)
-        x_coor = [bbox[i][0] for i in range(len(bbox))]
-        y_coor = [bbox[i][1] for i in range(len(bbox))]
+        bbox = ob.GetBoundingBox(True)
 
-        return min(x_coor), max(x_coor), min(y_coor), max(y_coor)
+        return bbox.Min.X, bbox.Max.X, bbox.Min.Y, bbox.Max.Y
 
-def get_cut_layer():
-    print "Getting cutting layer"
-    cut_found = False
-    layers = rs.LayerNames()
-    if layers:
-        for layer in layers:
-            if (layer.lower() == "cut"):
-                cut_found = True
-                print "Found layer: cut"
-                return layer
-        if not cut_found:
-            layers.append('None')
-            cut_layer = rs.GetString("Choose layer for cutting", None, layers)
-            if cut_layer == 'None':
-                print 'No cut layer chosen'
-                return None
-            elif cut_layer == False:
-                print 'No cut layer chosen'
-                return None
-            elif cut_layer not in layers:
-                print 'No such layer found'
-                return None
-            return cut_layer
-        
-def get_engrave_layer():
-    print "Getting engraving layer"
-    engrave_found = False
-    layers = rs.LayerNames()
+def in_bounds(ob, max_x_limit, max_y_limit):
+    """Returns True if an object lies within the machine's working area."""
+    min_x, max_x, min_y, max_y = bounding_box(ob)
+    return not (min_x < 0 or min_y < 0 or max_x > max_x_limit or max_y > max_y_limit)
+
+def get_layer(layers, lowered, name, description):
+    # layers and their lowercase names are read once by run_command and shared by every lookup
+    log("Getting " + description + " layer")
     if layers:
-        for layer in layers:
-            if (layer.lower() == "engrave"):
-                engrave_found = True
-                print "Found layer: engrave"
-                return layer
-        if not engrave_found:
-            layers.append('None')
-            engrave_layer = rs.GetString("Choose layer for engraving", None, layers)
-            if engrave_layer == 'None':
-                print 'No engrave layer chosen'
-                return None
-            elif engrave_layer == False:
-                print 'No engrave layer chosen'
-                return None
-            elif engrave_layer not in layers:
-                print 'No such layer found'
-                return None
-            return engrave_layer      
+        if name in lowered:
+            log("Found layer: " + name)
+            return layers[lowered.index(name)]
+        choices = layers + ['None']
+        layer = rs.GetString("Choose layer for " + description, None, choices)
+        if layer == 'None':
+            print 'No ' + name + ' layer chosen'
+            return None
+        elif layer == False:
+            print 'No ' + name + ' layer chosen'
+            return None
+        elif layer not in choices:
+            print 'No such layer found'
+            return None
+        return layer
 
 def get_objects_from_layer(layername):
     if layername == None:
         return None
-    print "Getting objects from layer: " + str(layername)
+    log("Getting objects from layer: " + str(layername))
     objects = rs.ObjectsByLayer(layername, False)
     if not objects:
         rs.MessageBox("Layer has no objects: " + str(layername), 0)
@@ -131,113 +119,107 @@ def get_objects_from_layer(layername):
 
 #Get points
 
-def process_line(line_id):
+def curve_kind(curve):
+    # Line and polyline geometry is recognised by its type before asking Rhino
+    if isinstance(curve, Rhino.Geometry.LineCurve):
+        return "line"
+    elif isinstance(curve, Rhino.Geometry.PolylineCurve):
+        # A polyline with only two points is a line, longer ones may still be collinear
+        if curve.PointCount == 2 or rs.IsLine(curve):
+            return "line"
+        return "polyline"
+    elif rs.IsLine(curve):
+        return "line"
+    elif rs.IsPolyline(curve):
+        return "polyline"
+    return "curve"
+
+# The process_* functions take curve geometry from rs.coercecurve, not object ids
+
+def process_line(line):
     line_output = []
-    line_output.append(rs.CurveStartPoint(line_id))
-    line_output.append(rs.CurveEndPoint(line_id))
+    line_output.append(line.PointAtStart)
+    line_output.append(line.PointAtEnd)
     return line_output
 
-def process_polyline(polyline_id):
+def process_polyline(polyline):
     polyline_output = []
-    points = rs.PolylineVertices(polyline_id)
+    points = rs.PolylineVertices(polyline)
     for point in points: 
         polyline_output.append(point)
     
-    polyline_output.append(rs.CurveEndPoint(polyline_id))
+    polyline_output.append(polyline.PointAtEnd)
     return polyline_output
 
-def process_curve(curve_id):
+def process_curve(curve, curve_length):
     curve_output = []
-    #Get the number of Divisions
-    curve_divisions = int(rs.CurveLength(curve_id))
-    
-    if (curve_divisions is None):
-        return
-
-    #Get the number of Curve Domains
-    curve_domain = rs.CurveDomain(curve_id, 0)
-
-    if (curve_domain is None):
-        return
+    #Get the number of Divisions, at least one so curves shorter than 1 mm keep their start point
+    curve_divisions = max(int(curve_length), 1)
 
+    #Get the Curve Domain and the parameter step between divisions
+    curve_start = curve.Domain.T0
+    curve_step = (curve.Domain.T1 - curve_start) / float(curve_divisions)
 
     for i in range(0, curve_divisions):
 
-        curve_param = curve_domain[0] + (((curve_domain[1] - curve_domain[0]) / (curve_divisions)) * i)
-
-        curve_point = rhinoscript.curve.EvaluateCurve(curve_id, curve_param)
-
-        if (curve_point is not None):
-
-            curve_output.append(curve_point)
+        curve_output.append(curve.PointAt(curve_start + curve_step * i))
             
-    curve_output.append(rs.CurveEndPoint(curve_id))
+    curve_output.append(curve.PointAtEnd)
     return curve_output
 
 # Sorting and other stuff
 
 def pt_to_gcode(dpts):
     # generates G-code from a set of points
-    gcode = ''
     ptzero = dpts[0]
-    gzero = str("G00 X" + str(round(ptzero[0],3)) + " Y" + str(round(ptzero[1],3)))
-    gcode += gzero + '\n'
-    gcode += 'M12' + '\n'
-    
-    for pt in dpts:
-        gcodeline = str("G01 X" + str(round(pt[0],3)) + " Y" + str(round(pt[1],3)))
-        gcode += gcodeline + '\n'
-    gcode += 'M22' + '\n'
+    gcode = [G00_FORMAT % (ptzero[0], ptzero[1]), "M12"]
+    gcode.extend([G01_FORMAT % (pt[0], pt[1]) for pt in dpts])
+    gcode.append("M22")
 
-    return gcode
+    return "\n".join(gcode)
+
+def closed_curve_area(obj):
+    try:
+        # Try solves issue of two duplicate lines forming a closed curve without area, returns zero
+        return rs.CurveArea(obj)[0]
+    except:
+        return 0
 
 def sort_layer(layer):
-    print "Sorting layer."
+    log("Sorting layer.")
     
     #Variables
     
     closed_curves = []
-    closed_curve_areas = []
     open_curves = []
-    sorted_list = []
+    other_objects = []
     
     #Divide objects into closed and open curves
     
     for obj in layer:
-        if rs.IsCurveClosed(obj):
+        if not rs.IsCurve(obj):
+            # Kept aside so process_objects counts them as skipped
+            other_objects.append(obj)
+        elif rs.IsCurveClosed(obj):
             closed_curves.append(obj)
         else:      
             open_curves.append(obj)
 
-    #Calculate area of each closed curve
-
-    for obj in closed_curves:
-        try:
-            # Try solves issue of two duplicate lines forming a closed curve without area, adds zero to list
-            area = rs.CurveArea(obj)
-            closed_curve_areas.append(area[0])
-        except:
-            closed_curve_areas.append(0)
-
     #Sort closed curves based on area, smallest first.
 
-    sorted_closed_curves = [closed_curves for closed_curve_areas, closed_curves in sorted(zip(closed_curve_areas, closed_curves))]
-    sorted_closed_curves.reverse()
+    closed_curves.sort(key=closed_curve_area)
 
-    # Combine lists
+    # Combine lists, open curves first
 
-    sorted_list.append(open_curves)
-    sorted_list.append(reversed(sorted_closed_curves))
-
-    return sorted_list
+    return other_objects + open_curves + closed_curves
 
 def process_objects(obj_ids, data):
-    print "Generating G-code from objects"
+    log("Generating G-code from objects")
 
 
     obj_ids_lines = []
-    obj_ids_pc = []
-    obj_ids_pc_delete = []
+    curves = []
+    curves_in_bounds = set()
     gcode_points = []
     output = []
 
@@ -249,61 +231,60 @@ def process_objects(obj_ids, data):
     cpolylines = 0
     ccurves = 0
 
-    flat_list = [image for mi in obj_ids for image in mi]
+    obj_clean = [x for x in obj_ids if x]
 
-    obj_clean = [x for x in flat_list if x]
+    # Machine dimensions are read once for every bounds check
+    max_x_limit = data["Max_X"]
+    max_y_limit = data["Max_Y"]
 
     for obj in obj_clean:
-        if rs.IsPolyCurve(obj):
-            c_layer = rs.ObjectLayer(obj)
-            segments = rs.ExplodeCurves(obj)
-            for x in segments:
-                rs.ObjectLayer(x, c_layer)
-                obj_ids_pc.append(x)
-                obj_ids_pc_delete.append(x)
+        # Look up the curve geometry once and read everything below from it
+        curve = rs.coercecurve(obj)
+        if curve is None:
+            s_objects += 1
+        elif isinstance(curve, Rhino.Geometry.PolyCurve):
+            # Segments are duplicated in memory, nothing is added to the document
+            segments = curve.DuplicateSegments()
+            # If the whole polycurve is in bounds, so is every segment
+            if in_bounds(curve, max_x_limit, max_y_limit):
+                curves_in_bounds.update(segments)
+            curves.extend(segments)
         else:
-            obj_ids_pc.append(obj)
+            curves.append(curve)
 
     
-    for obj_id in obj_ids_pc:
+    for curve in curves:
     
-        #Checks if the object is out of bounds (also needs to check for machine dimensions...)
-        min_x, max_x, min_y, max_y = bounding_box(obj_id)
-        if (min_x < 0) or (min_y < 0):
-           o_o_b += 1
-        elif (max_x > data["Max_X"]) or (max_y > data["Max_Y"]):
+        #Checks if the object is out of bounds, unless its polycurve already was
+        if curve not in curves_in_bounds and not in_bounds(curve, max_x_limit, max_y_limit):
            o_o_b += 1
         else:
-            clength += rs.CurveLength(obj_id)
-            if rs.IsLine(obj_id):
+            length = curve.GetLength()
+            clength += length
+            kind = curve_kind(curve)
+            if kind == "line":
                 # Lines
-                gcode_points = process_line(obj_id)
+                gcode_points = process_line(curve)
                 # Her maa man ta en try fordi process_line kan streike, hvis den gir false maa man +1 skipped obj + return
                 g_code = pt_to_gcode(gcode_points)
                 clines +=1
                 output.append(g_code)
                 
-            elif rs.IsPolyline(obj_id):
+            elif kind == "polyline":
                 # Polylines
-                gcode_points = process_polyline(obj_id)
+                gcode_points = process_polyline(curve)
                 # Her maa man ta en try fordi process_line kan streike, hvis den gir false maa man +1 skipped obj + return
                 g_code = pt_to_gcode(gcode_points)
                 cpolylines +=1
                 output.append(g_code)
 
-            elif rs.IsCurve(obj_id):      
+            else:      
                 # Curves
-                gcode_points = process_curve(obj_id)
+                gcode_points = process_curve(curve, length)
                 # Her maa man ta en try fordi process_line kan streike, hvis den gir false maa man +1 skipped obj + return
                 g_code = pt_to_gcode(gcode_points)
                 ccurves +=1
                 output.append(g_code)
-            else:      
-                # Other objects
-                skipped_objects += 1
-    
-    for x in obj_ids_pc_delete:
-    	rs.DeleteObject(x)
 
     return output, clength, clines, cpolylines, ccurves, o_o_b, s_objects 
 
@@ -349,8 +330,10 @@ def run_command(is_interactive):
 
 
     #Make list with objects from cut and engrave objects
-    engrave_layer_a = get_engrave_layer()
-    cut_layer_a = get_cut_layer()
+    layers = rs.LayerNames() or []
+    lowered = [layer.lower() for layer in layers]
+    engrave_layer_a = get_layer(layers, lowered, "engrave", "engraving")
+    cut_layer_a = get_layer(layers, lowered, "cut", "cutting")
 
     if cut_layer_a == None and engrave_layer_a == None:
         rs.MessageBox("Sorry, you need to select at least a cut or an engrave layer, alternatively you can make layers titled cut and engrave, which will be processed automatically", 0)
@@ -374,6 +357,7 @@ def run_command(is_interactive):
         return
 
     material_data = data["Materials"][mat]
+    material_name = str(material_data["MaterialName"])
 
 
     #Sort objects
@@ -426,11 +410,11 @@ def run_command(is_interactive):
     #Concatenate final G-code
 
     summary = ("Settings Server: \n" + data["Name"] + '\n\n'
-             + "Original Rhino File Name: " + str(rs.DocumentName()) + '\n'
+             + "Original Rhino File Name: " + str(doc_name) + '\n'
              + "Selected Cutting layer: " + str(cut_layer_a) + '\n'
              + "Selected Engraving layer: " + str(engrave_layer_a) + '\n'
              + "Generation date and time: " + str(now.strftime('%Y-%m-%d %H:%M:%S')) + '\n'
-    	     + "Selected Material Profile: " + str(material_data["MaterialName"]) + '\n\n'
+    	     + "Selected Material Profile: " + material_name + '\n\n'
     	     + "Cutting Lines processed: " + str(cutting_lines) + "\n"
              + "Cutting Polylines processed: " + str(cutting_polylines) + "\n"
              + "Cutting Curves processed: " + str(cutting_curves) + "\n"
@@ -448,31 +432,23 @@ def run_command(is_interactive):
              + "Total Time: " + str(datetime.timedelta(seconds = int(total_time))) + "\n\n"
              + "Script by Asbjorn Steinskog (IDI) and Pasi Aalto (AB)\nNTNU Trondheim - www.ntnu.edu\n\n")
 
-    final_gcode = ("(\n" + summary + "\n)\n\n"
-    	            + '\n'
-    	            + str(data["Start-up"])
-                    + '\n'
-                    + 'G00 COriginalFilename-' + str(rs.DocumentName())
-                    + '\n'
-                    + 'G00 CLaserProfile-' + str(material_data["MaterialName"])
-                    + '\n'
-                    + 'G00 CTimeEstimate-' + str(datetime.timedelta(seconds = int(total_time)))		
-                    + '\n'
-                    + 'G97 S' + str(material_data["EngravingPower"])
-                    + '\n'
-                    + 'G98 P265 E' + str(material_data["EngravingPulse"])
-                    + '\n'
-                    + 'G01 F' + str(material_data["EngravingSpeed"])
-                    + '\n'
-                    + '\n'.join(map(str, engrave_gcode_exists))
-                    + 'G97 S' + str(material_data["CuttingPower"])
-                    + '\n'
-                    + 'G98 P265 E' + str(material_data["CuttingPulse"])
-                    + '\n'
-                    + 'G01 F' + str(material_data["CuttingSpeed"])
-                    + '\n'
-                    + '\n'.join(map(str, cut_gcode_exists))
-                    + str(data["End"]))
+    final_gcode = [
+        "(\n" + summary + "\n)\n\n",
+        str(data["Start-up"]),
+        "G00 COriginalFilename-" + str(doc_name),
+        "G00 CLaserProfile-" + material_name,
+        "G00 CTimeEstimate-" + str(datetime.timedelta(seconds = int(total_time))),
+        "G97 S" + str(material_data["EngravingPower"]),
+        "G98 P265 E" + str(material_data["EngravingPulse"]),
+        "G01 F" + str(material_data["EngravingSpeed"])]
+    final_gcode.extend(engrave_gcode_exists)
+    final_gcode.extend([
+        "G97 S" + str(material_data["CuttingPower"]),
+        "G98 P265 E" + str(material_data["CuttingPulse"]),
+        "G01 F" + str(material_data["CuttingSpeed"])])
+    final_gcode.extend(cut_gcode_exists)
+    final_gcode.append(str(data["End"]))
+    final_gcode = "\n".join(final_gcode)
     
     # Add G-code to Notes in Rhino Document
     rs.Notes(newnotes=final_gcode)
@@ -483,19 +459,15 @@ def run_command(is_interactive):
 
     savepath = rs.SaveFileName("Save laser file as (material profile and ending automatically added)")
     if savepath is not None:
-        savefile = savepath + '_' + str(material_data["MaterialName"]) + '.nc'
+        savefile = savepath + '_' + material_name + '.nc'
     else:
         return
 
     
 
-    finalfile = open(savefile, 'w')
-
-    if (finalfile is None):
-        return
-    else:
+    # Text mode keeps the Windows line endings the controller expects
+    with open(savefile, 'w', 1 << 20) as finalfile:
         finalfile.write(final_gcode)
-        finalfile.close()
     
    
 